@@ -4,61 +4,145 @@ Convert Claude session JSONL data to markdown format.
 """
 
 import json
+import mmap
 import os
 import argparse
 import re
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
 
+try:
+    import orjson  # much faster JSON parsing when available
+except ImportError:
+    orjson = None
+
+
+# Local command output and caveats are never part of the conversation
+SKIP_MESSAGE_RE = re.compile(r'<local-command-stdout>|Caveat:')
+# User command invocations like /add-dir, /help
+USER_COMMAND_RE = re.compile(r'<command-(?:name|message|args)>')
+
+FUNCTION_CALLS_START = '<function_calls>'
+FUNCTION_CALLS_END = '</function_calls>'
+
+
+def strip_function_calls(text):
+    """Remove <function_calls>...</function_calls> blocks from text and trim it."""
+    # Plain str.find scanning; a block without a closing tag is left alone
+    if FUNCTION_CALLS_START not in text:
+        return text.strip()
+
+    parts = []
+    pos = 0
+    while True:
+        start = text.find(FUNCTION_CALLS_START, pos)
+        if start < 0:
+            break
+        end = text.find(FUNCTION_CALLS_END, start + len(FUNCTION_CALLS_START))
+        if end < 0:
+            break
+        parts.append(text[pos:start])
+        pos = end + len(FUNCTION_CALLS_END)
+    parts.append(text[pos:])
+    return ''.join(parts).strip()
+
+
+# Parsed messages, stored as parallel lists (one entry per message) rather than a dict per message
+Session = namedtuple('Session', ['roles', 'contents', 'timestamps', 'uuids'])
+
+ContentFlags = namedtuple('ContentFlags', ['include_thinking', 'omit_tool_use', 'omit_tool_results', 'omit_function_calls'])
+
+
+def format_json(obj):
+    """Pretty-print obj as JSON indented by two spaces, using orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode('utf-8')
+        except TypeError:
+            pass
+    return json.dumps(obj, indent=2, ensure_ascii=False)
+
+
+def _append_text(item, text_parts, flags):
+    text = item.get('text', '')
+    # Remove function_calls blocks if requested
+    if flags.omit_function_calls:
+        text = strip_function_calls(text)
+    if text:
+        text_parts.append(text)
+
+
+def _append_thinking(item, text_parts, flags):
+    # Optionally include thinking blocks
+    if flags.include_thinking:
+        thinking = item.get('thinking', '')
+        if thinking:
+            text_parts.append(f"<details><summary>💭 Thinking</summary>\n\n{thinking}\n\n</details>")
+
+
+def _append_tool_use(item, text_parts, flags):
+    # Format tool use (unless omitted)
+    if not flags.omit_tool_use:
+        tool_name = item.get('name', 'unknown')
+        tool_input = format_json(item.get('input', {}))
+        text_parts.append(f"**Tool Use: {tool_name}**\n```json\n{tool_input}\n```")
+
+
+def _append_tool_result(item, text_parts, flags):
+    # Format tool results (unless omitted)
+    if not flags.omit_tool_results:
+        tool_result = item.get('content', '')
+        if isinstance(tool_result, str):
+            text_parts.append(f"**Tool Result:**\n```\n{tool_result}\n```")
+        else:
+            text_parts.append(f"**Tool Result:**\n```json\n{format_json(tool_result)}\n```")
+
+
+# Content block type -> function appending its formatted text
+CONTENT_HANDLERS = {
+    'text': _append_text,
+    'thinking': _append_thinking,
+    'tool_use': _append_tool_use,
+    'tool_result': _append_tool_result,
+}
+
 
 def extract_text_from_content(content, include_thinking=False, omit_tool_use=False, omit_tool_results=False, omit_function_calls=False):
     """Extract readable text from message content."""
-    if isinstance(content, str):
+    return extract_text(content, ContentFlags(include_thinking, omit_tool_use, omit_tool_results, omit_function_calls))
+
+
+def extract_text(content, flags):
+    """Extract readable text from message content, with the filters given as ContentFlags."""
+    omit_function_calls = flags.omit_function_calls
+    # Parsed JSON only produces exact str/list/dict, so identity checks on
+    # type() are enough and cheaper than isinstance()
+    content_type = type(content)
+
+    if content_type is str:
         text = content
         # Remove function_calls blocks if requested
         if omit_function_calls:
-            text = re.sub(r'<function_calls>.*?</function_calls>', '', text, flags=re.DOTALL)
-            text = text.strip()
+            text = strip_function_calls(text)
         return text
 
-    if isinstance(content, list):
+    if content_type is list:
+        handlers = CONTENT_HANDLERS
         text_parts = []
         for item in content:
-            if isinstance(item, dict):
-                if item.get('type') == 'text':
-                    text = item.get('text', '')
-                    # Remove function_calls blocks if requested
-                    if omit_function_calls:
-                        text = re.sub(r'<function_calls>.*?</function_calls>', '', text, flags=re.DOTALL)
-                        text = text.strip()
-                    if text:
-                        text_parts.append(text)
-                elif item.get('type') == 'thinking':
-                    # Optionally include thinking blocks
-                    if include_thinking:
-                        thinking = item.get('thinking', '')
-                        if thinking:
-                            text_parts.append(f"<details><summary>💭 Thinking</summary>\n\n{thinking}\n\n</details>")
-                elif item.get('type') == 'tool_use':
-                    # Format tool use (unless omitted)
-                    if not omit_tool_use:
-                        tool_name = item.get('name', 'unknown')
-                        tool_input = json.dumps(item.get('input', {}), indent=2)
-                        text_parts.append(f"**Tool Use: {tool_name}**\n```json\n{tool_input}\n```")
-                elif item.get('type') == 'tool_result':
-                    # Format tool results (unless omitted)
-                    if not omit_tool_results:
-                        tool_result = item.get('content', '')
-                        if isinstance(tool_result, str):
-                            text_parts.append(f"**Tool Result:**\n```\n{tool_result}\n```")
-                        else:
-                            text_parts.append(f"**Tool Result:**\n```json\n{json.dumps(tool_result, indent=2)}\n```")
-            elif isinstance(item, str):
+            item_type = type(item)
+            if item_type is dict:
+                handler = handlers.get(item.get('type'))
+                if handler:
+                    handler(item, text_parts, flags)
+            elif item_type is str:
                 text = item
                 # Remove function_calls blocks if requested
                 if omit_function_calls:
-                    text = re.sub(r'<function_calls>.*?</function_calls>', '', text, flags=re.DOTALL)
-                    text = text.strip()
+                    text = strip_function_calls(text)
                 if text:
                     text_parts.append(text)
         return '\n\n'.join(text_parts)
@@ -66,118 +150,196 @@ def extract_text_from_content(content, include_thinking=False, omit_tool_use=Fal
     return str(content)
 
 
+def json_loads(data):
+    """Parse JSON from str or bytes, using orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson is stricter (e.g. big integers, NaN); let json decide
+            pass
+    return json.loads(data)
+
+
+def iter_lines(path):
+    """Yield the lines of a file as raw bytes, memory-mapping it when possible."""
+    with open(path, 'rb') as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Empty files can't be mapped; fall back to buffered reads
+            yield from f
+            return
+
+        with mm:
+            size = len(mm)
+            pos = 0
+            while pos < size:
+                end = mm.find(b'\n', pos)
+                if end < 0:
+                    end = size
+                yield mm[pos:end]
+                pos = end + 1
+
+
 def parse_jsonl_session(jsonl_path, include_thinking=False, omit_tool_use=False, omit_user_commands=False, omit_tool_results=False, omit_function_calls=False):
-    """Parse a JSONL session file and extract messages."""
-    messages = []
-
-    with open(jsonl_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            try:
-                data = json.loads(line.strip())
-
-                # Skip non-message types
-                if data.get('type') not in ['user', 'assistant']:
-                    continue
-
-                # Skip meta messages
-                if data.get('isMeta', False):
-                    continue
-
-                msg = data.get('message', {})
-                role = msg.get('role')
-                content = msg.get('content', '')
-                timestamp = data.get('timestamp', '')
-
-                # Extract text content
-                text = extract_text_from_content(content, include_thinking, omit_tool_use, omit_tool_results, omit_function_calls)
-
-                # Filter out empty messages and system commands
-                if not text or text.strip() == '':
-                    continue
-
-                # Skip local command outputs and caveats
-                if '<local-command-stdout>' in text or 'Caveat:' in text:
-                    continue
-
-                # Skip user command invocations if requested
-                if omit_user_commands and role == 'user':
-                    if '<command-name>' in text or '<command-message>' in text or '<command-args>' in text:
-                        continue
-
-                messages.append({
-                    'role': role,
-                    'content': text,
-                    'timestamp': timestamp,
-                    'uuid': data.get('uuid', '')
-                })
-
-            except json.JSONDecodeError:
-                continue
+    """Parse a JSONL session file and extract messages into a Session."""
+    session = Session([], [], [], [])
+    flags = ContentFlags(include_thinking, omit_tool_use, omit_tool_results, omit_function_calls)
+
+    # Look up everything the per-line loop calls once, outside the loop
+    add_role = session.roles.append
+    add_content = session.contents.append
+    add_timestamp = session.timestamps.append
+    add_uuid = session.uuids.append
+    is_skipped_message = SKIP_MESSAGE_RE.search
+    is_user_command = USER_COMMAND_RE.search
+
+    for line in iter_lines(jsonl_path):
+        try:
+            data = json_loads(line)
+        except json.JSONDecodeError:
+            continue
+
+        get = data.get
 
-    return messages
+        # Skip non-message types
+        if get('type') not in ('user', 'assistant'):
+            continue
+
+        # Skip meta messages
+        if get('isMeta', False):
+            continue
+
+        msg = get('message', {})
+        role = msg.get('role')
+
+        # Extract text content
+        text = extract_text(msg.get('content', ''), flags)
+
+        # Filter out empty messages and system commands
+        if not text or text.isspace():
+            continue
+
+        # Skip local command outputs and caveats
+        if is_skipped_message(text):
+            continue
+
+        # Skip user command invocations if requested
+        if omit_user_commands and role == 'user' and is_user_command(text):
+            continue
+
+        add_role(role)
+        add_content(text)
+        add_timestamp(get('timestamp', ''))
+        add_uuid(get('uuid', ''))
+
+    return session
+
+
+if sys.version_info >= (3, 11):
+    # fromisoformat accepts the trailing 'Z' Claude writes from 3.11 on
+    parse_timestamp = datetime.fromisoformat
+else:
+    def parse_timestamp(timestamp):
+        """Parse an ISO 8601 timestamp like 2025-10-01T12:34:56.789Z (to the second)."""
+        return datetime(int(timestamp[0:4]), int(timestamp[5:7]), int(timestamp[8:10]),
+                        int(timestamp[11:13]), int(timestamp[14:16]), int(timestamp[17:19]))
 
 
-def convert_to_markdown(messages, session_name, output_path):
-    """Convert messages to markdown format."""
-    md_lines = [f"# {session_name}\n"]
+def convert_to_markdown(session, session_name, output_path):
+    """Convert a parsed Session to markdown format, writing each message as it is formatted."""
+    with open(output_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
+        # Every section after the title starts with the blank line separating it from the previous one
+        f.write(f"# {session_name}\n")
 
-    if messages:
-        first_ts = messages[0].get('timestamp', '')
-        if first_ts:
-            dt = datetime.fromisoformat(first_ts.replace('Z', '+00:00'))
-            md_lines.append(f"*Session Date: {dt.strftime('%Y-%m-%d %H:%M:%S')}*\n")
+        if session.timestamps:
+            first_ts = session.timestamps[0]
+            if first_ts:
+                dt = parse_timestamp(first_ts)
+                f.write(f"\n*Session Date: {dt.strftime('%Y-%m-%d %H:%M:%S')}*\n")
 
-    md_lines.append("---\n")
+        f.write("\n---\n")
 
-    for i, msg in enumerate(messages, 1):
-        role = msg['role']
-        content = msg['content']
+        for role, content in zip(session.roles, session.contents):
+            if role == 'user':
+                f.write(f"\n## User\n\n{content}\n")
+            elif role == 'assistant':
+                f.write(f"\n## Assistant\n\n{content}\n")
 
-        if role == 'user':
-            md_lines.append(f"## User\n\n{content}\n")
-        elif role == 'assistant':
-            md_lines.append(f"## Assistant\n\n{content}\n")
+            f.write("\n\n---\n")
 
-        md_lines.append("\n---\n")
 
-    # Write to file
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(md_lines))
+def find_jsonl_files(directory):
+    """Recursively yield the paths of .jsonl files under directory.
 
+    Uses os.scandir so only matching entries become Path objects; symlinked
+    directories are not followed and unreadable ones are skipped.
+    """
+    try:
+        entries = os.scandir(directory)
+    except PermissionError:
+        return
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from find_jsonl_files(entry.path)
+            elif entry.name.endswith('.jsonl'):
+                yield Path(entry.path)
 
-def process_jsonl_files(projects_dir, output_dir, include_thinking=False, omit_tool_use=False, omit_user_commands=False, omit_tool_results=False, omit_function_calls=False):
-    """Process all JSONL files in the projects directory."""
+
+def convert_session_file(jsonl_file, projects_path, output_path, parse_options):
+    """Convert one JSONL session file to markdown and return a status line.
+
+    parse_options holds the flag arguments of parse_jsonl_session, in order.
+    Runs in a worker process when called from process_jsonl_files.
+    """
+    # Create output filename
+    relative_path = jsonl_file.relative_to(projects_path)
+    session_name = str(relative_path.parent / relative_path.stem)
+
+    # Parse messages
+    session = parse_jsonl_session(jsonl_file, *parse_options)
+
+    if not session.roles:
+        return f"Skipping {jsonl_file.name} (no messages)"
+
+    # Create output path
+    output_file = output_path / f"{relative_path.parent.name}_{relative_path.stem}.md"
+
+    # Convert to markdown
+    convert_to_markdown(session, session_name, output_file)
+    return f"Converted {jsonl_file.name} -> {output_file.name} ({len(session.roles)} messages)"
+
+
+def process_jsonl_files(projects_dir, output_dir, include_thinking=False, omit_tool_use=False, omit_user_commands=False, omit_tool_results=False, omit_function_calls=False, jobs=None):
+    """Process all JSONL files in the projects directory.
+
+    Files are converted in parallel by up to jobs worker processes
+    (default: one per CPU).
+    """
     projects_path = Path(projects_dir)
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
 
-    jsonl_files = list(projects_path.rglob('*.jsonl'))
+    jsonl_files = list(find_jsonl_files(projects_path)) if projects_path.is_dir() else []
 
     print(f"Found {len(jsonl_files)} JSONL files")
 
-    for jsonl_file in jsonl_files:
-        # Skip agent session files
-        if jsonl_file.name.startswith('agent-'):
-            print(f"Skipping agent file: {jsonl_file.name}")
-            continue
-
-        # Create output filename
-        relative_path = jsonl_file.relative_to(projects_path)
-        session_name = str(relative_path.parent / relative_path.stem)
-
-        # Parse messages
-        messages = parse_jsonl_session(jsonl_file, include_thinking, omit_tool_use, omit_user_commands, omit_tool_results, omit_function_calls)
+    parse_options = (include_thinking, omit_tool_use, omit_user_commands, omit_tool_results, omit_function_calls)
 
-        if not messages:
-            print(f"Skipping {jsonl_file.name} (no messages)")
-            continue
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = []
+        for jsonl_file in jsonl_files:
+            # Skip agent session files
+            if jsonl_file.name.startswith('agent-'):
+                print(f"Skipping agent file: {jsonl_file.name}")
+                continue
 
-        # Create output path
-        output_file = output_path / f"{relative_path.parent.name}_{relative_path.stem}.md"
+            futures.append(executor.submit(convert_session_file, jsonl_file, projects_path, output_path, parse_options))
 
-        # Convert to markdown
-        convert_to_markdown(messages, session_name, output_file)
-        print(f"Converted {jsonl_file.name} -> {output_file.name} ({len(messages)} messages)")
+        for future in as_completed(futures):
+            print(future.result())
 
 
 def main():
@@ -198,23 +360,28 @@ def main():
                         help='Omit user command invocations from the output')
     parser.add_argument('--single-file', '-f',
                         help='Convert a single JSONL file instead of scanning directory')
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                        help='Number of files to convert in parallel (default: number of CPUs)')
 
     args = parser.parse_args()
 
+    if args.jobs is not None and args.jobs < 1:
+        parser.error('--jobs must be at least 1')
+
     if args.single_file:
         # Convert single file
         jsonl_path = Path(args.single_file)
         output_path = Path(args.output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
 
-        messages = parse_jsonl_session(jsonl_path, args.include_thinking, args.omit_tool_use, args.omit_user_commands, args.omit_tool_results, args.omit_function_calls)
+        session = parse_jsonl_session(jsonl_path, args.include_thinking, args.omit_tool_use, args.omit_user_commands, args.omit_tool_results, args.omit_function_calls)
         output_file = output_path / f"{jsonl_path.stem}.md"
 
-        convert_to_markdown(messages, jsonl_path.stem, output_file)
-        print(f"Converted {jsonl_path.name} -> {output_file.name} ({len(messages)} messages)")
+        convert_to_markdown(session, jsonl_path.stem, output_file)
+        print(f"Converted {jsonl_path.name} -> {output_file.name} ({len(session.roles)} messages)")
     else:
         # Process all files in directory
-        process_jsonl_files(args.projects_dir, args.output_dir, args.include_thinking, args.omit_tool_use, args.omit_user_commands, args.omit_tool_results, args.omit_function_calls)
+        process_jsonl_files(args.projects_dir, args.output_dir, args.include_thinking, args.omit_tool_use, args.omit_user_commands, args.omit_tool_results, args.omit_function_calls, args.jobs)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Checks that strip_function_calls matches the regex it replaced.
+
+Run with: python3 -m unittest test_jsonl_to_markdown
+"""
+
+import random
+import re
+import unittest
+
+from jsonl_to_markdown import strip_function_calls
+
+FUNCTION_CALLS_RE = re.compile(r'<function_calls>.*?</function_calls>', re.DOTALL)
+
+
+def strip_with_regex(text):
+    return FUNCTION_CALLS_RE.sub('', text).strip()
+
+
+class StripFunctionCallsTest(unittest.TestCase):
+
+    CASES = [
+        '',
+        '  plain text \n',
+        'before <function_calls>call</function_calls> after',
+        '<function_calls>\nmulti\nline\n</function_calls>\n\nanswer',
+        # Nested openers: the first closer ends the block
+        'a <function_calls>x<function_calls>y</function_calls>z</function_calls> b',
+        # Unclosed trailing block is kept
+        'answer <function_calls>never closed',
+        'a <function_calls>1</function_calls> b <function_calls>unclosed',
+        # Back-to-back blocks
+        '<function_calls>1</function_calls><function_calls>2</function_calls>tail',
+        'x<function_calls></function_calls><function_calls></function_calls>y',
+        # Stray closer without an opener
+        'a </function_calls> b',
+        '</function_calls><function_calls>x</function_calls>',
+    ]
+
+    def test_cases_match_regex(self):
+        for text in self.CASES:
+            self.assertEqual(strip_function_calls(text), strip_with_regex(text), repr(text))
+
+    def test_random_texts_match_regex(self):
+        rng = random.Random(0)
+        tokens = ['<function_calls>', '</function_calls>', 'a', ' ', '\n', '<', '>', 'function_calls']
+        for _ in range(5000):
+            text = ''.join(rng.choice(tokens) for _ in range(rng.randint(0, 12)))
+            self.assertEqual(strip_function_calls(text), strip_with_regex(text), repr(text))
+
+
+if __name__ == '__main__':
+    unittest.main()
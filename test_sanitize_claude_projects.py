@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Checks that the sanitizer's fast path redacts everything --validate does.
+
+Run with: python3 -m unittest test_sanitize_claude_projects
+"""
+
+import contextlib
+import io
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import sanitize_claude_projects as sanitizer
+
+# Message texts whose secrets only line up with a pattern once the JSON
+# escapes in the raw line are decoded
+RECORDS = [
+    {"type": "user", "message": {"content": 'token:\t"abc123"'}},
+    {"type": "user", "message": {"content": 'config:\n  password:\n    "hunter2"'}},
+    {"type": "user", "message": {"content": 'Account:\n123456789012'}},
+    {"type": "user", "message": {"content": 'aws_session_token =\n"FwoGZXIvYXdzEJr"'}},
+    {"type": "user", "message": {"content": '{"token": "abc"}'}},
+    {"type": "user", "message": {"content": 'path C:\\new\\table and \\"quoted\\"'}},
+    {"type": "user", "message": {"content": "nothing to see here"}},
+    {"type": "user", "toolUseResult": {"Account": "123456789012", "AccountId": 123456789012, "Accounts": 3}},
+    {"type": "user", "toolUseResult": {"Credentials": {
+        "AccessKeyId": "ASIAEXAMPLE",
+        "SecretAccessKey": "wJalrXUtnFEMI/K7MDENG/bPxRfiCYEXAMPLEKEY",
+    }}},
+]
+
+
+def sanitize_records(records, validate):
+    """Run sanitize_jsonl_file over records and return the parsed output lines."""
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = Path(tmp) / 'in.jsonl'
+        output_path = Path(tmp) / 'out.jsonl'
+        input_path.write_text(''.join(json.dumps(r) + '\n' for r in records), encoding='utf-8')
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert sanitizer.sanitize_jsonl_file(input_path, output_path, validate=validate)
+        return [json.loads(line) for line in output_path.read_text(encoding='utf-8').splitlines()]
+
+
+class FastPathTest(unittest.TestCase):
+
+    def test_fast_path_matches_validate(self):
+        self.assertEqual(sanitize_records(RECORDS, validate=False),
+                         sanitize_records(RECORDS, validate=True))
+
+    def test_escaped_whitespace_secrets_are_redacted(self):
+        contents = [r['message']['content'] for r in sanitize_records(RECORDS[:4], validate=False)]
+        self.assertIn('[TOKEN REDACTED]', contents[0])
+        self.assertIn('[PASSWORD REDACTED]', contents[1])
+        self.assertIn('[AWS ACCOUNT ID REDACTED]', contents[2])
+        self.assertIn('[AWS SESSION TOKEN REDACTED]', contents[3])
+
+    def test_lines_with_nothing_to_redact_are_copied_unchanged(self):
+        line = '{"type": "user",  "message": {"content": "caf\\u00e9 \\"ok\\"\\n"}}\n'
+        with tempfile.TemporaryDirectory() as tmp:
+            input_path = Path(tmp) / 'in.jsonl'
+            output_path = Path(tmp) / 'out.jsonl'
+            input_path.write_text(line * 2, encoding='utf-8')
+            with contextlib.redirect_stdout(io.StringIO()):
+                sanitizer.sanitize_jsonl_file(input_path, output_path)
+            self.assertEqual(output_path.read_text(encoding='utf-8'), line * 2)
+
+    def test_secret_access_key_member_is_redacted(self):
+        credentials = sanitize_records(RECORDS[-1:], validate=False)[0]['toolUseResult']['Credentials']
+        self.assertEqual(credentials['SecretAccessKey'], '[AWS SECRET KEY REDACTED]')
+        self.assertEqual(credentials['AccessKeyId'], 'ASIAEXAMPLE')
+
+    def test_account_id_members_are_redacted(self):
+        result = sanitize_records(RECORDS[-2:-1], validate=False)[0]['toolUseResult']
+        self.assertEqual(result['Account'], '[AWS ACCOUNT ID REDACTED]')
+        self.assertEqual(result['AccountId'], '[AWS ACCOUNT ID REDACTED]')
+        self.assertEqual(result['Accounts'], 3)
+
+
+class DryRunTest(unittest.TestCase):
+
+    def assert_dry_run_matches_real_run(self, text, suffix):
+        with tempfile.TemporaryDirectory() as tmp:
+            input_path = Path(tmp) / f'in{suffix}'
+            input_path.write_text(text, encoding='utf-8')
+            dry_run_total = sum(sanitizer.count_redactions(input_path))
+            with contextlib.redirect_stdout(io.StringIO()) as out:
+                assert sanitizer.sanitize_file(input_path, Path(tmp) / f'out{suffix}')
+        self.assertIn(f'Redacted {dry_run_total} sensitive items', out.getvalue())
+        self.assertGreater(dry_run_total, 0)
+
+    def test_jsonl_dry_run_matches_real_run(self):
+        self.assert_dry_run_matches_real_run(''.join(json.dumps(r) + '\n' for r in RECORDS), '.jsonl')
+
+    def test_json_dry_run_matches_real_run(self):
+        self.assert_dry_run_matches_real_run(json.dumps(RECORDS[-1], indent=2), '.json')
+
+
+class RegexEngineTest(unittest.TestCase):
+
+    # Capture-group patterns, whose redaction relies on match.lastgroup naming
+    # the outer g<i> group even though the inner group matched too
+    TEXTS = [
+        'Account:\n123456789012',
+        'aws account id 123456789012 in arn:aws:iam::123456789012:role/deploy',
+        '{"Credentials": {"SecretAccessKey": "wJalrXUtnFEMI/K7MDENG/bPxRfiCYEXAMPLEKEY"}}',
+        'aws_secret_access_key = "wJalrXUtnFEMI/K7MDENG/bPxRfiCYEXAMPLEKEY"',
+        'SecretAccessKey wJalrXUtnFEMI/K7MDENG/bPxRfiCYEXAMPLEKEY, AccountId 123456789012',
+    ]
+
+    def sanitize_with(self, engine, text):
+        sanitizer.use_regex_engine(engine)
+        counts = [0] * len(sanitizer.SENSITIVE_PATTERNS)
+        return sanitizer.sanitize_text(text, counts), counts
+
+    @unittest.skipIf(sanitizer.re2 is None, 'google-re2 is not installed')
+    def test_re2_matches_re(self):
+        self.addCleanup(sanitizer.use_regex_engine, 'auto')
+        for text in self.TEXTS:
+            expected = self.sanitize_with('re', text)
+            self.assertNotEqual(expected[0], text)
+            self.assertEqual(self.sanitize_with('re2', text), expected, text)
+
+
+class DetectFileFormatTest(unittest.TestCase):
+
+    def detect(self, text):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'in'
+            path.write_text(text, encoding='utf-8')
+            return sanitizer.detect_file_format(path)
+
+    def test_formats(self):
+        big = 'x' * sanitizer.SNIFF_SIZE
+        self.assertEqual(self.detect(''), 'empty')
+        self.assertEqual(self.detect('  \n'), 'empty')
+        self.assertEqual(self.detect('not json'), 'unknown')
+        self.assertEqual(self.detect('{"a": 1}\n{"b": 2}\n'), 'jsonl')
+        self.assertEqual(self.detect('\n{"a": 1}\n\n{"b": 2}'), 'jsonl')
+        self.assertEqual(self.detect('{"a": 1}\n'), 'json')
+        self.assertEqual(self.detect(json.dumps({"a": [1, 2]}, indent=2)), 'json')
+        self.assertEqual(self.detect(json.dumps({"a": big})), 'json')
+        self.assertEqual(self.detect(json.dumps({"a": big}, indent=2)), 'json')
+        self.assertEqual(self.detect('{"a": 1}\n' + json.dumps({"b": big}) + '\n'), 'jsonl')
+
+
+class SerializationTest(unittest.TestCase):
+
+    def test_non_finite_floats_survive_redaction(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            input_path = Path(tmp) / 'in.jsonl'
+            output_path = Path(tmp) / 'out.jsonl'
+            input_path.write_text('{"v": NaN, "t": "\\"token\\": \\"abc\\""}\n', encoding='utf-8')
+            with contextlib.redirect_stdout(io.StringIO()):
+                sanitizer.sanitize_jsonl_file(input_path, output_path)
+            output = output_path.read_text(encoding='utf-8')
+        self.assertIn('NaN', output)
+        self.assertIn('[TOKEN REDACTED]', output)
+
+
+if __name__ == '__main__':
+    unittest.main()